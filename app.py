@@ -6,7 +6,7 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import random
 import calendar
-from streamlit_extras.metric_cards import style_metric_cards
+import functools
 
 # Set page configuration
 st.set_page_config(
@@ -16,14 +16,26 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Currency abbreviations as (threshold, divisor, suffix), largest first
+CURRENCY_UNITS = ((1_000_000, 1_000_000, 'M'), (1_000, 1_000, 'K'))
+
 # Format numbers with K and M abbreviations
 def format_currency(value):
-    if value >= 1_000_000:
-        return f"${value/1_000_000:.1f}M"
-    elif value >= 1_000:
-        return f"${value/1_000:.1f}K"
-    else:
-        return f"${value:,.0f}"
+    # Round to cents first so repeated aggregates share a cache entry despite float noise
+    return _format_currency(round(float(value), 2))
+
+@functools.lru_cache(maxsize=256)
+def _format_currency(value):
+    for threshold, divisor, suffix in CURRENCY_UNITS:
+        if value >= threshold:
+            return f"${value/divisor:.1f}{suffix}"
+    return f"${value:,.0f}"
+
+# Format ratios as percentages below 1 and as plain multiples otherwise
+def format_ratio(values):
+    return np.where(values.abs() < 1,
+                    values.map('{:.1%}'.format),
+                    values.map('{:.2f}'.format))
 
 # Custom CSS for better styling
 st.markdown("""
@@ -54,65 +66,82 @@ st.markdown("""
         color: #DC143C !important;
         font-weight: bold;
     }
+    /* Metric cards (same rules as streamlit_extras' style_metric_cards defaults) */
+    div[data-testid="stMetric"],
+    div[data-testid="metric-container"] {
+        background-color: #FFF;
+        border: 1px solid #CCC;
+        padding: 5% 5% 5% 10%;
+        border-radius: 5px;
+        border-left: 0.5rem solid #9AD8E1 !important;
+        box-shadow: 0 0.15rem 1.75rem 0 rgba(58, 59, 69, 0.15) !important;
+    }
 </style>
 """, unsafe_allow_html=True)
 
 # Generate enhanced financial data with budget and cash flow components
+@st.cache_data(ttl=3600, show_spinner=False)
 def generate_financial_data():
-    np.random.seed(42)
+    rng = np.random.default_rng(42)
     
     # Generate dates for the last 12 months
     end_date = datetime.now()
     start_date = end_date - timedelta(days=365)
     dates = pd.date_range(start_date, end_date, freq='M')
+    n = len(dates)
+    
+    # Per-month uniform factors drawn in a single batch, one (low, high) pair per column
+    factor_bounds = np.array([
+        (1.05, 1.1),   # budget revenue: 5-10% above actual
+        (0.6, 0.7),    # expense ratio: 60-70% of revenue
+        (0.95, 1.0),   # budget expenses
+        (0.8, 1.2),    # operating cash flow
+        (0.1, 0.3),    # investing cash flow
+        (-0.2, 0.2),   # financing cash flow
+        (0.3, 0.5),    # current assets
+        (0.2, 0.4)     # current liabilities
+    ])
+    (budget_revenue_factor, expense_ratio, budget_expense_factor, operating_factor,
+     investing_factor, financing_factor, assets_factor, liabilities_factor) = rng.uniform(
+        factor_bounds[:, 0], factor_bounds[:, 1], size=(n, len(factor_bounds))
+    ).T
     
     # Generate revenue data with seasonal pattern
     base_revenue = 1000000
-    revenue_trend = np.linspace(0.9, 1.2, len(dates))
-    seasonal_factor = np.sin(np.linspace(0, 4*np.pi, len(dates))) * 0.1 + 1
-    revenue = base_revenue * revenue_trend * seasonal_factor * np.random.normal(1, 0.05, len(dates))
+    revenue_trend = np.linspace(0.9, 1.2, n)
+    seasonal_factor = np.sin(np.linspace(0, 4*np.pi, n)) * 0.1 + 1
+    revenue = base_revenue * revenue_trend * seasonal_factor * rng.normal(1, 0.05, n)
     
     # Generate budget data (5-10% higher than actual for variance analysis)
-    budget_revenue = revenue * np.random.uniform(1.05, 1.1, len(dates))
+    budget_revenue = revenue * budget_revenue_factor
     
     # Generate expense data (60-70% of revenue)
-    expense_ratio = np.random.uniform(0.6, 0.7, len(dates))
-    expenses = revenue * expense_ratio * np.random.normal(1, 0.03, len(dates))
-    budget_expenses = expenses * np.random.uniform(0.95, 1.0, len(dates))
+    expenses = revenue * expense_ratio * rng.normal(1, 0.03, n)
+    budget_expenses = expenses * budget_expense_factor
     
     # Calculate profit
     profit = revenue - expenses
     budget_profit = budget_revenue - budget_expenses
     
     # Generate cash flow data
-    operating_cash_flow = profit * np.random.uniform(0.8, 1.2, len(dates))
-    investing_cash_flow = -expenses * np.random.uniform(0.1, 0.3, len(dates))
-    financing_cash_flow = profit * np.random.uniform(-0.2, 0.2, len(dates))
+    operating_cash_flow = profit * operating_factor
+    investing_cash_flow = -expenses * investing_factor
+    financing_cash_flow = profit * financing_factor
     net_cash_flow = operating_cash_flow + investing_cash_flow + financing_cash_flow
     
     # Generate working capital metrics
-    current_assets = revenue * np.random.uniform(0.3, 0.5, len(dates))
-    current_liabilities = expenses * np.random.uniform(0.2, 0.4, len(dates))
+    current_assets = revenue * assets_factor
+    current_liabilities = expenses * liabilities_factor
     
-    # Generate department-wise data
+    # Generate department-wise data as (months x departments) arrays
     departments = ['Sales', 'Marketing', 'R&D', 'Operations', 'Administration']
-    dept_data = []
-    for i, date in enumerate(dates):
-        for dept in departments:
-            dept_revenue = revenue[i] * np.random.uniform(0.1, 0.3)
-            dept_expenses = expenses[i] * np.random.uniform(0.15, 0.25)
-            dept_budget_revenue = dept_revenue * np.random.uniform(1.05, 1.1)
-            dept_budget_expenses = dept_expenses * np.random.uniform(0.95, 1.0)
-            dept_data.append({
-                'Date': date,
-                'Department': dept,
-                'Revenue': dept_revenue,
-                'Expenses': dept_expenses,
-                'Profit': dept_revenue - dept_expenses,
-                'Budget_Revenue': dept_budget_revenue,
-                'Budget_Expenses': dept_budget_expenses,
-                'Budget_Profit': dept_budget_revenue - dept_budget_expenses
-            })
+    shape = (n, len(departments))
+    dept_revenue = revenue[:, None] * rng.uniform(0.1, 0.3, shape)
+    dept_expenses = expenses[:, None] * rng.uniform(0.15, 0.25, shape)
+    dept_budget_revenue = dept_revenue * rng.uniform(1.05, 1.1, shape)
+    dept_budget_expenses = dept_expenses * rng.uniform(0.95, 1.0, shape)
+    # Month labels are Arrow-backed strings; Department is categorical with a fixed order
+    month_labels = pd.array(dates.strftime('%B %Y'), dtype='string[pyarrow]')
     
     # Create main dataframe
     main_df = pd.DataFrame({
@@ -131,12 +160,21 @@ def generate_financial_data():
         'Net_Cash_Flow': net_cash_flow,
         'Current_Assets': current_assets,
         'Current_Liabilities': current_liabilities,
-        'Month': dates.strftime('%B %Y')
+        'Month': month_labels
     })
     
-    # Create department dataframe
-    dept_df = pd.DataFrame(dept_data)
-    dept_df['Month'] = dept_df['Date'].dt.strftime('%B %Y')
+    # Create department dataframe (one row per month and department)
+    dept_df = pd.DataFrame({
+        'Date': np.repeat(dates, len(departments)),
+        'Department': pd.Categorical(np.tile(departments, n), categories=departments),
+        'Revenue': dept_revenue.ravel(),
+        'Expenses': dept_expenses.ravel(),
+        'Profit': (dept_revenue - dept_expenses).ravel(),
+        'Budget_Revenue': dept_budget_revenue.ravel(),
+        'Budget_Expenses': dept_budget_expenses.ravel(),
+        'Budget_Profit': (dept_budget_revenue - dept_budget_expenses).ravel(),
+        'Month': month_labels.repeat(len(departments))
+    })
     
     return main_df, dept_df
 
@@ -147,18 +185,25 @@ main_df, dept_df = generate_financial_data()
 st.sidebar.header("Dashboard Controls")
 st.sidebar.markdown("---")
 
-# Time period filter
+# Time period filter (days of history kept; None keeps the full 12 months)
+TIME_PERIOD_DAYS = {
+    "Last 3 Months": 90,
+    "Last 6 Months": 180,
+    "Last 12 Months": None,
+    "All Time": None
+}
 time_period = st.sidebar.selectbox(
     "Time Period",
-    ["Last 3 Months", "Last 6 Months", "Last 12 Months", "All Time"],
+    list(TIME_PERIOD_DAYS),
     index=2
 )
 
 # Department filter
+all_departments = dept_df['Department'].cat.categories.tolist()
 department_filter = st.sidebar.multiselect(
     "Departments",
-    options=dept_df['Department'].unique(),
-    default=dept_df['Department'].unique()
+    options=all_departments,
+    default=all_departments
 )
 
 # Additional filters
@@ -186,34 +231,41 @@ expense_scenario = st.sidebar.slider(
 st.sidebar.markdown("---")
 st.sidebar.info("Use filters to customize your financial analysis")
 
-# Filter data based on selections
-if time_period == "Last 3 Months":
-    filtered_main = main_df[main_df['Date'] >= main_df['Date'].max() - timedelta(days=90)]
-    filtered_dept = dept_df[dept_df['Date'] >= dept_df['Date'].max() - timedelta(days=90)]
-elif time_period == "Last 6 Months":
-    filtered_main = main_df[main_df['Date'] >= main_df['Date'].max() - timedelta(days=180)]
-    filtered_dept = dept_df[dept_df['Date'] >= dept_df['Date'].max() - timedelta(days=180)]
-elif time_period == "Last 12 Months":
-    filtered_main = main_df
-    filtered_dept = dept_df
-else:
-    filtered_main = main_df
-    filtered_dept = dept_df
-
-filtered_dept = filtered_dept[filtered_dept['Department'].isin(department_filter)]
+# Filter data based on selections and apply scenario analysis
+@st.cache_data(max_entries=64, show_spinner=False)
+def apply_filters(main_df, dept_df, time_period, departments, revenue_scenario, expense_scenario):
+    days = TIME_PERIOD_DAYS[time_period]
+    if days is not None:
+        # Both frames share the same monthly dates, so one cutoff serves both
+        cutoff = main_df['Date'].max() - timedelta(days=days)
+        filtered_main = main_df[main_df['Date'] >= cutoff]
+        filtered_dept = dept_df[dept_df['Date'] >= cutoff]
+    else:
+        filtered_main = main_df
+        filtered_dept = dept_df
+
+    # Department is categorical, so isin compares codes; skip it entirely when every department is selected
+    if set(departments) != set(dept_df['Department'].cat.categories):
+        filtered_dept = filtered_dept[filtered_dept['Department'].isin(departments)]
+
+    # Apply scenario analysis in a single pass, only touching the adjusted columns
+    if revenue_scenario != 0 or expense_scenario != 0:
+        revenue = filtered_main['Revenue'].to_numpy() * (1 + revenue_scenario / 100)
+        expenses = filtered_main['Expenses'].to_numpy() * (1 + expense_scenario / 100)
+        profit = revenue - expenses
+        filtered_main = filtered_main.assign(
+            Revenue=revenue,
+            Expenses=expenses,
+            Profit=profit,
+            **{'Profit Margin': profit / revenue}
+        )
 
-# Apply scenario analysis
-if revenue_scenario != 0:
-    filtered_main = filtered_main.copy()
-    filtered_main['Revenue'] = filtered_main['Revenue'] * (1 + revenue_scenario / 100)
-    filtered_main['Profit'] = filtered_main['Revenue'] - filtered_main['Expenses']
-    filtered_main['Profit Margin'] = filtered_main['Profit'] / filtered_main['Revenue']
+    return filtered_main, filtered_dept
 
-if expense_scenario != 0:
-    filtered_main = filtered_main.copy()
-    filtered_main['Expenses'] = filtered_main['Expenses'] * (1 + expense_scenario / 100)
-    filtered_main['Profit'] = filtered_main['Revenue'] - filtered_main['Expenses']
-    filtered_main['Profit Margin'] = filtered_main['Profit'] / filtered_main['Revenue']
+# Departments are passed as a tuple so the cache key is hashable
+filtered_main, filtered_dept = apply_filters(
+    main_df, dept_df, time_period, tuple(department_filter), revenue_scenario, expense_scenario
+)
 
 # Main dashboard
 st.markdown('<h1 class="main-header">💰 Financial Controlling Dashboard</h1>', unsafe_allow_html=True)
@@ -224,102 +276,194 @@ if revenue_scenario != 0 or expense_scenario != 0:
     st.info(f"**Scenario Active:** Revenue {revenue_scenario:+.0f}%, Expenses {expense_scenario:+.0f}%")
 
 # Enhanced key metrics with trends
+# The previous period is everything before the selected window; both periods are aggregated in one pass each
+KPI_AGGREGATIONS = {'Revenue': 'sum', 'Expenses': 'sum', 'Profit': 'sum', 'Profit Margin': 'mean'}
+prev_main = main_df[main_df['Date'] < filtered_main['Date'].min()] if len(filtered_main) > 0 else filtered_main
+current_kpis = filtered_main.agg(KPI_AGGREGATIONS)
+prev_kpis = prev_main.agg(KPI_AGGREGATIONS)
+
+# Percentage change for the totals (0 when there is no prior period), point change for the margin
+totals = ['Revenue', 'Expenses', 'Profit']
+total_changes = ((current_kpis[totals] - prev_kpis[totals]) / prev_kpis[totals] * 100).where(prev_kpis[totals] > 0, 0)
+margin_change = (current_kpis['Profit Margin'] - prev_kpis['Profit Margin']) * 100
+
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    total_revenue = filtered_main['Revenue'].sum()
-    prev_revenue = main_df[main_df['Date'] < filtered_main['Date'].min()]['Revenue'].sum() if len(filtered_main) > 0 else total_revenue
-    revenue_change = ((total_revenue - prev_revenue) / prev_revenue * 100) if prev_revenue > 0 else 0
-    st.metric("Total Revenue", format_currency(total_revenue), f"{revenue_change:+.1f}%")
+    st.metric("Total Revenue", format_currency(current_kpis['Revenue']), f"{total_changes['Revenue']:+.1f}%")
 
 with col2:
-    total_expenses = filtered_main['Expenses'].sum()
-    prev_expenses = main_df[main_df['Date'] < filtered_main['Date'].min()]['Expenses'].sum() if len(filtered_main) > 0 else total_expenses
-    expenses_change = ((total_expenses - prev_expenses) / prev_expenses * 100) if prev_expenses > 0 else 0
-    st.metric("Total Expenses", format_currency(total_expenses), f"{expenses_change:+.1f}%")
+    st.metric("Total Expenses", format_currency(current_kpis['Expenses']), f"{total_changes['Expenses']:+.1f}%")
 
 with col3:
-    total_profit = filtered_main['Profit'].sum()
-    prev_profit = main_df[main_df['Date'] < filtered_main['Date'].min()]['Profit'].sum() if len(filtered_main) > 0 else total_profit
-    profit_change = ((total_profit - prev_profit) / prev_profit * 100) if prev_profit > 0 else 0
-    st.metric("Total Profit", format_currency(total_profit), f"{profit_change:+.1f}%")
+    st.metric("Total Profit", format_currency(current_kpis['Profit']), f"{total_changes['Profit']:+.1f}%")
 
 with col4:
-    avg_margin = filtered_main['Profit Margin'].mean() * 100
-    prev_margin = main_df[main_df['Date'] < filtered_main['Date'].min()]['Profit Margin'].mean() * 100 if len(filtered_main) > 0 else avg_margin
-    margin_change = avg_margin - prev_margin
-    st.metric("Avg Profit Margin", f"{avg_margin:.1f}%", f"{margin_change:+.1f}%")
-
-# Style metric cards
-style_metric_cards()
-
-# Performance overview section
-st.markdown("---")
-st.subheader("Performance Overview")
-
-# Enhanced charts with multiple visualizations including Cash Flow
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["Trend Analysis", "Department Performance", "Financial Ratios", "Advanced Analytics", "Cash Flow Dashboard"])
+    st.metric("Avg Profit Margin", f"{current_kpis['Profit Margin'] * 100:.1f}%", f"{margin_change:+.1f}%")
+
+# Chart builders, cached on the content of the (column-trimmed) frames they receive
+FRAME_HASH_FUNCS = {pd.DataFrame: lambda df: pd.util.hash_pandas_object(df, index=True).sum()}
+
+# Shared layout for the time-series trend charts
+COMMON_LAYOUT = dict(
+    height=400,
+    hovermode='x unified',
+    showlegend=True,
+    plot_bgcolor='rgba(0,0,0,0)',
+    paper_bgcolor='rgba(0,0,0,0)'
+)
 
-with tab1:
+@st.cache_data(max_entries=64, show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
+def build_revenue_expense_fig(df):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=df['Date'], y=df['Revenue'], 
+                            name='Revenue', line=dict(color='#2E8B57', width=3)))
+    fig.add_trace(go.Scatter(x=df['Date'], y=df['Expenses'], 
+                            name='Expenses', line=dict(color='#DC143C', width=3)))
+    fig.update_layout(**COMMON_LAYOUT)
+    return fig
+
+@st.cache_data(max_entries=64, show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
+def build_profit_margin_fig(df):
+    fig = px.line(df, x='Date', y='Profit Margin',
+                  title='', labels={'Profit Margin': 'Profit Margin (%)'})
+    fig.update_traces(line=dict(color='#4169E1', width=3))
+    fig.update_layout(**COMMON_LAYOUT, yaxis_tickformat=".1%")
+    return fig
+
+# Department totals shared by both department charts, in alphabetical order
+# (Department is categorical, so groupby alone would follow the category order)
+@st.cache_data(max_entries=64, show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
+def dept_summary_for(filtered_dept):
+    return filtered_dept.groupby('Department', observed=True).agg(
+        Revenue=('Revenue', 'sum'),
+        Expenses=('Expenses', 'sum'),
+        Profit=('Profit', 'sum')
+    ).reset_index().sort_values('Department', key=lambda s: s.astype(str), ignore_index=True)
+
+@st.cache_data(max_entries=64, show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
+def build_dept_profit_fig(dept_summary):
+    fig = px.bar(dept_summary, x='Department', y='Profit',
+                 title='', color='Profit',
+                 color_continuous_scale='Viridis')
+    fig.update_layout(height=400)
+    return fig
+
+@st.cache_data(max_entries=64, show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
+def build_dept_revenue_fig(dept_summary):
+    fig = px.pie(dept_summary, values='Revenue', names='Department',
+                 title='', hole=0.3)
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    return fig
+
+@st.cache_data(max_entries=64, show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
+def build_ratios_fig(ratios_df):
+    fig = px.bar(ratios_df, x='Ratio', y='Value',
+                 title='Financial Ratios vs Targets',
+                 color='Status', color_discrete_map={'✅ Good': '#2E8B57', '⚠️ Needs Attention': '#DC143C'})
+    fig.add_hline(y=0.25, line_dash="dash", line_color="red", annotation_text="Target Line")
+    fig.update_layout(height=500, xaxis_tickangle=45)
+    return fig
+
+@st.cache_data(max_entries=64, show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
+def build_heatmap_fig(df):
+    # Monthly performance heatmap (all 12 months shown, missing months as 0)
+    all_months = list(range(1, 13))
+    heatmap_data = (
+        df.groupby([df['Date'].dt.year.rename('Year'),
+                    df['Date'].dt.month.rename('Month')])['Profit Margin']
+        .mean()
+        .unstack('Month')
+        .reindex(columns=all_months)
+        .fillna(0)
+    )
+    
+    return px.imshow(heatmap_data,
+                     labels=dict(x="Month", y="Year", color="Profit Margin"),
+                     x=[calendar.month_abbr[i] for i in all_months],
+                     title="Monthly Profit Margin Heatmap",
+                     color_continuous_scale="Viridis")
+
+@st.cache_data(max_entries=64, show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
+def build_correlation_fig(df):
+    labels = list(df.columns)
+    corr_matrix = np.corrcoef(df.to_numpy(), rowvar=False)
+    return px.imshow(corr_matrix, 
+                     x=labels,
+                     y=labels,
+                     text_auto=True, 
+                     aspect="auto",
+                     title="Correlation Matrix",
+                     color_continuous_scale="RdBu_r")
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def build_cash_flow_fig(operating, investing, financing):
+    cash_flow_data = {
+        'Category': ['Operating', 'Investing', 'Financing'],
+        'Amount': [operating, investing, financing]
+    }
+    
+    fig = px.bar(cash_flow_data, x='Category', y='Amount',
+                 title='Cash Flow Components',
+                 color='Category',
+                 color_discrete_map={
+                     'Operating': '#2E8B57',
+                     'Investing': '#4169E1',
+                     'Financing': '#FFA500'
+                 })
+    fig.update_layout(height=400)
+    return fig
+
+@st.cache_data(max_entries=64, show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
+def build_net_cash_fig(df):
+    fig = px.line(df, x='Date', y='Net_Cash_Flow',
+                  title='Net Cash Flow Trend',
+                  labels={'Net_Cash_Flow': 'Net Cash Flow ($)'})
+    fig.update_traces(line=dict(color='#DC143C', width=3))
+    fig.update_layout(height=400)
+    return fig
+
+# Each view is wrapped in a fragment as scaffolding for in-view widgets. Every input currently
+# lives in the sidebar, so these views still rerun with the whole script.
+@st.fragment
+def render_tab_trend(filtered_main):
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("Revenue vs Expenses Trend")
-        fig1 = go.Figure()
-        fig1.add_trace(go.Scatter(x=filtered_main['Date'], y=filtered_main['Revenue'], 
-                                name='Revenue', line=dict(color='#2E8B57', width=3)))
-        fig1.add_trace(go.Scatter(x=filtered_main['Date'], y=filtered_main['Expenses'], 
-                                name='Expenses', line=dict(color='#DC143C', width=3)))
-        fig1.update_layout(
-            height=400,
-            hovermode='x unified',
-            showlegend=True,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)'
-        )
+        fig1 = build_revenue_expense_fig(filtered_main[['Date', 'Revenue', 'Expenses']])
         st.plotly_chart(fig1, use_container_width=True)
     
     with col2:
         st.subheader("Profit Margin Trend")
-        fig2 = px.line(filtered_main, x='Date', y='Profit Margin',
-                      title='', labels={'Profit Margin': 'Profit Margin (%)'})
-        fig2.update_traces(line=dict(color='#4169E1', width=3))
-        fig2.update_layout(
-            height=400, 
-            yaxis_tickformat=".1%",
-            hovermode='x unified',
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)'
-        )
+        fig2 = build_profit_margin_fig(filtered_main[['Date', 'Profit Margin']])
         st.plotly_chart(fig2, use_container_width=True)
 
-with tab2:
+@st.fragment
+def render_tab_departments(filtered_dept):
     col1, col2 = st.columns(2)
     
     with col1:
-        dept_summary = filtered_dept.groupby('Department').agg({
-            'Revenue': 'sum',
-            'Expenses': 'sum',
-            'Profit': 'sum'
-        }).reset_index()
+        dept_summary = dept_summary_for(filtered_dept)
         
         st.subheader("Profit by Department")
-        fig3 = px.bar(dept_summary, x='Department', y='Profit',
-                     title='', color='Profit',
-                     color_continuous_scale='Viridis')
-        fig3.update_layout(height=400)
+        fig3 = build_dept_profit_fig(dept_summary)
         st.plotly_chart(fig3, use_container_width=True)
     
     with col2:
         st.subheader("Revenue Distribution")
-        fig4 = px.pie(dept_summary, values='Revenue', names='Department',
-                     title='', hole=0.3)
-        fig4.update_traces(textposition='inside', textinfo='percent+label')
+        fig4 = build_dept_revenue_fig(dept_summary)
         st.plotly_chart(fig4, use_container_width=True)
 
-with tab3:
+@st.fragment
+def render_tab_ratios(filtered_main, main_df):
     # Enhanced financial ratios with advanced metrics
-    latest_data = filtered_main.iloc[-1] if len(filtered_main) > 0 else main_df.iloc[-1]
+    # Pull the needed columns out once as numpy arrays so scalar lookups skip Series construction
+    source = filtered_main if len(filtered_main) > 0 else main_df
+    cols = {c: source[c].to_numpy() for c in ['Revenue', 'Expenses', 'Profit', 'Profit Margin',
+                                              'Budget_Revenue', 'Budget_Expenses', 'Current_Assets',
+                                              'Current_Liabilities', 'Operating_Cash_Flow']}
+    latest_data = {c: values[-1] for c, values in cols.items()}
     
     # Calculate additional advanced ratios
     ebitda_margin = latest_data['Profit'] / latest_data['Revenue']  # Simplified EBITDA
@@ -350,7 +494,7 @@ with tab3:
             latest_data['Profit'] / latest_data['Revenue'],
             ebitda_margin,
             latest_data['Expenses'] / latest_data['Revenue'],
-            (filtered_main['Revenue'].iloc[-1] / filtered_main['Revenue'].iloc[-2] - 1) if len(filtered_main) > 1 else 0,
+            (cols['Revenue'][-1] / cols['Revenue'][-2] - 1) if len(filtered_main) > 1 else 0,
             latest_data['Profit'] / latest_data['Expenses'] if latest_data['Expenses'] > 0 else 0,
             current_ratio,
             quick_ratio,
@@ -363,103 +507,56 @@ with tab3:
     }
     
     ratios_df = pd.DataFrame(ratios_data)
-    ratios_df['Status'] = ratios_df.apply(
-        lambda x: '✅ Good' if (x['Ratio'] in ['Revenue Variance', 'Expense Variance'] and abs(x['Value']) <= 0.05)
-                  or (x['Ratio'] not in ['Revenue Variance', 'Expense Variance'] and x['Value'] >= x['Target'])
-                  else '⚠️ Needs Attention', axis=1
-    )
+    is_variance = ratios_df['Ratio'].isin(['Revenue Variance', 'Expense Variance'])
+    is_good = np.where(is_variance,
+                       ratios_df['Value'].abs() <= 0.05,
+                       ratios_df['Value'] >= ratios_df['Target'])
+    ratios_df['Status'] = np.where(is_good, '✅ Good', '⚠️ Needs Attention')
     
     st.subheader("Advanced Financial Ratios Analysis")
-    st.dataframe(ratios_df.style.format({
-        'Value': lambda x: '{:.1%}'.format(x) if isinstance(x, float) and abs(x) < 1 else '{:.2f}'.format(x),
-        'Target': lambda x: '{:.1%}'.format(x) if isinstance(x, float) and abs(x) < 1 else '{:.2f}'.format(x),
-        'Industry Avg': lambda x: '{:.1%}'.format(x) if isinstance(x, float) and abs(x) < 1 else '{:.2f}'.format(x)
-    }), use_container_width=True, height=500)
+    ratios_display = ratios_df.assign(
+        Value=format_ratio(ratios_df['Value']),
+        Target=format_ratio(ratios_df['Target']),
+        **{'Industry Avg': format_ratio(ratios_df['Industry Avg'])}
+    )
+    st.dataframe(ratios_display, use_container_width=True, height=500)
     
     # Ratio performance chart
-    fig_ratios = px.bar(ratios_df, x='Ratio', y='Value',
-                       title='Financial Ratios vs Targets',
-                       color='Status', color_discrete_map={'✅ Good': '#2E8B57', '⚠️ Needs Attention': '#DC143C'})
-    fig_ratios.add_hline(y=0.25, line_dash="dash", line_color="red", annotation_text="Target Line")
-    fig_ratios.update_layout(height=500, xaxis_tickangle=45)
+    fig_ratios = build_ratios_fig(ratios_df[['Ratio', 'Value', 'Status']])
     st.plotly_chart(fig_ratios, use_container_width=True)
 
-with tab4:
+@st.fragment
+def render_tab_analytics(filtered_main):
     st.subheader("Advanced Analytics")
     
     # Monthly performance heatmap
-    monthly_data = filtered_main.copy()
-    monthly_data['Year'] = monthly_data['Date'].dt.year
-    monthly_data['Month'] = monthly_data['Date'].dt.month
-    
-    heatmap_data = monthly_data.pivot_table(
-        values='Profit Margin',
-        index='Year',
-        columns='Month',
-        aggfunc='mean'
-    ).fillna(0)
-    
-    # Ensure we have all 12 months for proper display
-    all_months = list(range(1, 13))
-    for month in all_months:
-        if month not in heatmap_data.columns:
-            heatmap_data[month] = 0
-    
-    # Reorder columns to ensure proper month order
-    heatmap_data = heatmap_data[all_months]
-    
-    fig_heatmap = px.imshow(heatmap_data,
-                          labels=dict(x="Month", y="Year", color="Profit Margin"),
-                          x=[calendar.month_abbr[i] for i in all_months],
-                          title="Monthly Profit Margin Heatmap",
-                          color_continuous_scale="Viridis")
+    fig_heatmap = build_heatmap_fig(filtered_main[['Date', 'Profit Margin']])
     st.plotly_chart(fig_heatmap, use_container_width=True)
     
     # Correlation analysis
     st.subheader("Financial Metrics Correlation")
-    corr_matrix = filtered_main[['Revenue', 'Expenses', 'Profit', 'Profit Margin']].corr()
-    fig_corr = px.imshow(corr_matrix, 
-                        text_auto=True, 
-                        aspect="auto",
-                        title="Correlation Matrix",
-                        color_continuous_scale="RdBu_r")
+    fig_corr = build_correlation_fig(filtered_main[['Revenue', 'Expenses', 'Profit', 'Profit Margin']])
     st.plotly_chart(fig_corr, use_container_width=True)
 
-with tab5:
+@st.fragment
+def render_tab_cash_flow(filtered_main, main_df):
     st.subheader("Cash Flow Analysis")
     
     col1, col2 = st.columns(2)
     
     with col1:
         # Cash flow components
-        latest_cash_flow = filtered_main.iloc[-1] if len(filtered_main) > 0 else main_df.iloc[-1]
-        cash_flow_data = {
-            'Category': ['Operating', 'Investing', 'Financing'],
-            'Amount': [
-                latest_cash_flow['Operating_Cash_Flow'],
-                latest_cash_flow['Investing_Cash_Flow'],
-                latest_cash_flow['Financing_Cash_Flow']
-            ]
-        }
-        
-        fig_cash_flow = px.bar(cash_flow_data, x='Category', y='Amount',
-                              title='Cash Flow Components',
-                              color='Category',
-                              color_discrete_map={
-                                  'Operating': '#2E8B57',
-                                  'Investing': '#4169E1',
-                                  'Financing': '#FFA500'
-                              })
-        fig_cash_flow.update_layout(height=400)
+        source = filtered_main if len(filtered_main) > 0 else main_df
+        fig_cash_flow = build_cash_flow_fig(
+            source['Operating_Cash_Flow'].to_numpy()[-1],
+            source['Investing_Cash_Flow'].to_numpy()[-1],
+            source['Financing_Cash_Flow'].to_numpy()[-1]
+        )
         st.plotly_chart(fig_cash_flow, use_container_width=True)
     
     with col2:
         # Net cash flow trend
-        fig_net_cash = px.line(filtered_main, x='Date', y='Net_Cash_Flow',
-                              title='Net Cash Flow Trend',
-                              labels={'Net_Cash_Flow': 'Net Cash Flow ($)'})
-        fig_net_cash.update_traces(line=dict(color='#DC143C', width=3))
-        fig_net_cash.update_layout(height=400)
+        fig_net_cash = build_net_cash_fig(filtered_main[['Date', 'Net_Cash_Flow']])
         st.plotly_chart(fig_net_cash, use_container_width=True)
     
     # Cash flow metrics
@@ -482,6 +579,35 @@ with tab5:
         current_ratio_avg = filtered_main['Current_Assets'].mean() / filtered_main['Current_Liabilities'].mean()
         st.metric("Avg Current Ratio", f"{current_ratio_avg:.2f}")
 
+# Performance overview section
+st.markdown("---")
+st.subheader("Performance Overview")
+
+# Enhanced charts with multiple visualizations including Cash Flow
+# Views are picked with a radio instead of st.tabs so only the selected one is built on each rerun
+active_view = st.radio(
+    "View",
+    ["Trend Analysis", "Department Performance", "Financial Ratios", "Advanced Analytics", "Cash Flow Dashboard"],
+    horizontal=True,
+    label_visibility="collapsed"
+)
+
+if active_view == "Trend Analysis":
+    render_tab_trend(filtered_main)
+elif active_view == "Department Performance":
+    render_tab_departments(filtered_dept)
+elif active_view == "Financial Ratios":
+    render_tab_ratios(filtered_main, main_df)
+elif active_view == "Advanced Analytics":
+    render_tab_analytics(filtered_main)
+else:
+    render_tab_cash_flow(filtered_main, main_df)
+
+# Serialize frames for download; cached so unchanged filters skip re-serialization
+@st.cache_data(max_entries=64, show_spinner=False)
+def to_csv_bytes(df):
+    return df.to_csv(index=False).encode()
+
 # Data export and additional features
 st.markdown("---")
 st.subheader("Data Management")
@@ -490,12 +616,9 @@ col1, col2 = st.columns(2)
 
 with col1:
     # Enhanced download options
-    csv_main = filtered_main.to_csv(index=False)
-    csv_dept = filtered_dept.to_csv(index=False)
-    
     st.download_button(
         label="Download Main Data (CSV)",
-        data=csv_main,
+        data=to_csv_bytes(filtered_main),
         file_name="financial_main_data.csv",
         mime="text/csv",
         key="main_csv"
@@ -503,7 +626,7 @@ with col1:
     
     st.download_button(
         label="Download Department Data (CSV)",
-        data=csv_dept,
+        data=to_csv_bytes(filtered_dept),
         file_name="financial_department_data.csv",
         mime="text/csv",
         key="dept_csv"
@@ -529,26 +652,29 @@ if st.checkbox("Show Detailed Data View"):
     
     data_view = st.selectbox("Select Data View", ["Main Financial Data", "Department Data"])
     
+    # Display copies with pre-formatted string columns; the numeric frames stay untouched
     if data_view == "Main Financial Data":
-        st.dataframe(filtered_main.style.format({
-            'Revenue': '${:,.0f}',
-            'Expenses': '${:,.0f}',
-            'Profit': '${:,.0f}',
-            'Profit Margin': '{:.1%}'
-        }), use_container_width=True, height=400)
+        main_display = filtered_main.assign(
+            Revenue=filtered_main['Revenue'].map('${:,.0f}'.format),
+            Expenses=filtered_main['Expenses'].map('${:,.0f}'.format),
+            Profit=filtered_main['Profit'].map('${:,.0f}'.format),
+            **{'Profit Margin': filtered_main['Profit Margin'].map('{:.1%}'.format)}
+        )
+        st.dataframe(main_display, use_container_width=True, height=400)
     else:
-        st.dataframe(filtered_dept.style.format({
-            'Revenue': '${:,.0f}',
-            'Expenses': '${:,.0f}',
-            'Profit': '${:,.0f}'
-        }), use_container_width=True, height=400)
+        dept_display = filtered_dept.assign(
+            Revenue=filtered_dept['Revenue'].map('${:,.0f}'.format),
+            Expenses=filtered_dept['Expenses'].map('${:,.0f}'.format),
+            Profit=filtered_dept['Profit'].map('${:,.0f}'.format)
+        )
+        st.dataframe(dept_display, use_container_width=True, height=400)
 
 # Footer with additional information
 st.markdown("---")
 st.success("Dashboard successfully loaded with enhanced features!")
 st.info("""
 **New Features Added:**
-- Advanced visualizations with interactive tabs
+- Advanced visualizations with an interactive view selector
 - Enhanced filtering and analytics
 - Multiple chart types and heatmaps
 - Improved data export options